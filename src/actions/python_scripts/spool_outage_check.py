@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Write Spool Outage Check
+
+Runs the --spool path of documentUploader.py against a throwaway local mongod
+that is stopped and started while writes are being spooled, then checks that
+every write arrived exactly once, that a chat session with a dangling
+reference was held back, and that replaying already-applied inserts is
+harmless.
+
+Usage:
+    python spool_outage_check.py
+
+Needs a `mongod` binary on PATH (or set MONGOD=/path/to/mongod). Without one
+the check is skipped and exits successfully.
+"""
+
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+from bson import ObjectId
+
+from documentUploader import AldousDocumentUploader, WriteSpool
+
+
+class LocalMongod:
+    """A mongod on a free local port with its own data directory."""
+
+    def __init__(self, binary: str, dbpath: str):
+        self.binary = binary
+        self.dbpath = dbpath
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.uri = f"mongodb://127.0.0.1:{self.port}/?serverSelectionTimeoutMS=1000"
+        self.process = None
+
+    def start(self):
+        """Start mongod and wait until it answers a ping."""
+        self.process = subprocess.Popen(
+            [self.binary, '--dbpath', self.dbpath, '--port', str(self.port), '--bind_ip', '127.0.0.1'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        client = MongoClient(self.uri)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                client.admin.command('ping')
+                break
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("mongod did not start")
+                time.sleep(0.2)
+        client.close()
+
+    def stop(self):
+        """Stop mongod cleanly."""
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+            self.process = None
+
+
+def wait_for_drain(spool: WriteSpool, timeout: float = 90) -> bool:
+    """Wait until the spool is empty."""
+    deadline = time.monotonic() + timeout
+    while spool.pending() and time.monotonic() < deadline:
+        time.sleep(0.2)
+    return spool.pending() == 0
+
+
+def check(condition: bool, message: str) -> bool:
+    """Print a check result."""
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def run(mongod: LocalMongod, workdir: str) -> bool:
+    """Spool writes across an outage and verify what reached MongoDB."""
+    os.environ['ALDOUS_MONGODB_URI'] = mongod.uri
+    spool_path = os.path.join(workdir, 'spool.db')
+    uploader = AldousDocumentUploader(spool_path=spool_path)
+    ok = True
+
+    try:
+        profile_id = uploader.upload_document('profiles', {'name': 'Spool Test', 'country': 'USA', 'phone': '+15550100'})
+        agent_id = uploader.upload_document('agents', {'name': 'Spool Agent', 'aiModel': 'claude-3-5-sonnet-20241022',
+                                                       'phone': '+15550101'})
+
+        def session(i, subject_id=profile_id):
+            return {'subjectID': ObjectId(subject_id), 'assignedAgentID': ObjectId(agent_id),
+                    'language': 'English', 'sessionDate': datetime(2025, 1, 1, 0, i),
+                    'messages': [{'role': 'user', 'contentType': 'text', 'content': f"message {i}"}]}
+
+        for i in range(20):
+            uploader.upload_document('chatsessions', session(i))
+        ok &= check(wait_for_drain(uploader.spool), "Writes drained while mongod was up")
+
+        print("\n🛑 Stopping mongod")
+        mongod.stop()
+        for i in range(20, 40):
+            uploader.upload_document('chatsessions', session(i))
+        uploader.upload_document('chatsessions', session(40, subject_id=str(ObjectId())))
+        uploader.update_document('profiles', {'name': 'Spool Test'}, {'country': 'Canada'})
+        time.sleep(2)
+        ok &= check(uploader.spool.pending() == 22, f"Writes kept in the spool during the outage ({uploader.spool.pending()})")
+
+        print("\n▶️ Starting mongod")
+        mongod.start()
+        ok &= check(wait_for_drain(uploader.spool), "Spool drained after mongod came back")
+    finally:
+        uploader.close_connection()
+
+    db = MongoClient(mongod.uri)['aldous_db']
+    ok &= check(db['chatsessions'].count_documents({}) == 40, "Every valid chat session inserted exactly once")
+    ok &= check(db['profiles'].find_one({'name': 'Spool Test'})['country'] == 'Canada', "Spooled update applied after the inserts")
+    failed = sqlite3.connect(spool_path).execute("SELECT error FROM spool_failed").fetchall()
+    ok &= check(len(failed) == 1 and 'Dangling' in failed[0][0], "Session with a dangling subjectID held in spool_failed")
+
+    # Inserts that reached MongoDB before an interrupted flush deleted their rows are replayed harmlessly...
+    replay = WriteSpool(os.path.join(workdir, 'replay.db'), db)
+    existing = list(db['chatsessions'].find().limit(3))
+    for document in existing:
+        replay.append_insert('chatsessions', document)
+    replay._set_sent([1, 2, 3], True)
+    replay.flush()
+    failed = replay._conn.execute("SELECT seq FROM spool_failed").fetchall()
+    ok &= check(failed == [] and replay.pending() == 0, "A batch of already-applied inserts replays as applied")
+    # ...while a never-sent insert that collides with an existing _id is rejected
+    replay.append_insert('chatsessions', existing[0])
+    replay.flush()
+    failed = replay._conn.execute("SELECT seq FROM spool_failed").fetchall()
+    ok &= check(failed == [(4,)], "Duplicate _id counts as applied only for an already-sent row")
+    ok &= check(db['chatsessions'].count_documents({}) == 40, "Replay did not add documents")
+    replay.close(timeout=0)
+
+    return ok
+
+
+def main():
+    binary = os.getenv('MONGOD') or shutil.which('mongod')
+    if not binary:
+        print("⏭️ Skipped: no mongod binary found (install MongoDB or set MONGOD)")
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix='aldous_spool_check_')
+    dbpath = os.path.join(workdir, 'db')
+    os.makedirs(dbpath)
+    mongod = LocalMongod(binary, dbpath)
+
+    try:
+        mongod.start()
+        ok = run(mongod, workdir)
+    finally:
+        mongod.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Spool outage check passed" if ok else "\n❌ Spool outage check failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())